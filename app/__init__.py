@@ -3,7 +3,7 @@ from flask import Flask
 from flask_login import LoginManager
 from dotenv import load_dotenv
 
-def create_app():
+def create_app(test_config=None):
     # Load environment variables from .env file
     load_dotenv()
     
@@ -16,6 +16,10 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///student_management.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Overrides from the test suite, applied before extensions read the config
+    if test_config:
+        app.config.update(test_config)
+    
     # Initialize extensions
     from .models import db, User
     db.init_app(app)
@@ -41,8 +45,9 @@ def create_app():
     # Create database tables
     with app.app_context():
         db.create_all()
-        # Seed subjects if they don't exist
-        from .models import seed_subjects
-        seed_subjects()
+        # Seed subjects if they don't exist (tests create the rows they need)
+        if not app.config.get('TESTING'):
+            from .models import seed_subjects
+            seed_subjects()
     
     return app
\ No newline at end of file
@@ -1,6 +1,8 @@
 import io
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
 
 def generate_timetable_excel(entries_by_branch):
     """
@@ -8,16 +10,15 @@ def generate_timetable_excel(entries_by_branch):
     entries_by_branch: Dictionary { "BranchName": [TimetableEntry, ...] }
     Returns: BytesIO object containing the xlsx file
     """
-    wb = Workbook()
-    
-    # Remove default sheet
-    if wb.sheetnames:
-        wb.remove(wb.active)
+    # Write-only mode streams rows out instead of building a cell grid in memory
+    wb = Workbook(write_only=True)
     
     # If no data, create a blank sheet to avoid corruption
     if not entries_by_branch:
         wb.create_sheet("No Data")
     
+    headers = ['Semester', 'Day', 'Period', 'Time', 'Subject', 'Subject Code', 'Teacher']
+    
     for branch_name, branch_entries in entries_by_branch.items():
         # Sheet titles must be <= 31 chars and no invalid chars
         safe_title = "".join([c for c in branch_name if c.isalnum() or c in (' ', '-', '_')])[:30]
@@ -27,41 +28,36 @@ def generate_timetable_excel(entries_by_branch):
              
         ws = wb.create_sheet(title=safe_title)
         
-        # Headers
-        headers = ['Semester', 'Day', 'Period', 'Time', 'Subject', 'Subject Code', 'Teacher']
-        ws.append(headers)
+        rows = [
+            [
+                entry.semester,
+                entry.day,
+                entry.period_number,
+                f"{entry.start_time.strftime('%H:%M')} - {entry.end_time.strftime('%H:%M')}",
+                entry.assigned_class.subject.name,
+                entry.assigned_class.subject.code or '',
+                entry.assigned_class.teacher.name
+            ]
+            for entry in branch_entries
+        ]
+        
+        # Auto-adjust column width (write-only sheets need this before the first row)
+        for index, header in enumerate(headers):
+            max_length = max(len(str(value)) for value in [header] + [row[index] for row in rows])
+            # Cap width
+            ws.column_dimensions[get_column_letter(index + 1)].width = min(max_length + 2, 50)
         
         # Style header
-        for cell in ws[1]:
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
             cell.font = Font(bold=True)
             cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+            header_cells.append(cell)
+        ws.append(header_cells)
         
-        for entry in branch_entries:
-             ws.append([
-                 entry.semester,
-                 entry.day,
-                 entry.period_number,
-                 f"{entry.start_time.strftime('%H:%M')} - {entry.end_time.strftime('%H:%M')}",
-                 entry.assigned_class.subject.name,
-                 entry.assigned_class.subject.code or '',
-                 entry.assigned_class.teacher.name
-             ])
-        
-        # Auto-adjust column width
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            # Cap width
-            if adjusted_width > 50: 
-                adjusted_width = 50
-            ws.column_dimensions[column].width = adjusted_width
+        for row in rows:
+            ws.append(row)
             
     out = io.BytesIO()
     wb.save(out)
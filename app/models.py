@@ -2,8 +2,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timezone, time
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import func
+from sqlalchemy import func, lambda_stmt, select
+from functools import lru_cache
 import enum
+import json
+import os
 
 db = SQLAlchemy()
 
@@ -73,32 +76,32 @@ class User(UserMixin, db.Model):
         """Check if provided password matches hash"""
         return check_password_hash(self.password_hash, password)
     
+    def _semester_branch_codes(self):
+        """Branches whose subjects the user takes: their own and the common subjects"""
+        return [self.branch.value if self.branch else 'CSE', 'COMMON']
+    
     def get_subjects_for_semester(self):
         """Get all subjects for the user's current semester and branch"""
-        branch_code = self.branch.value if self.branch else 'CSE'
-        
-        # Get branch-specific subjects and common subjects
         return Subject.query.filter(
             Subject.semester == self.semester,
-            db.or_(
-                Subject.branch == branch_code,
-                Subject.branch == 'COMMON'
-            )
-        ).all()
-    
-    def get_attendance_for_subject(self, subject_id):
-        """Get attendance statistics for a specific subject"""
-        total_classes = Attendance.query.filter_by(
-            user_id=self.id, 
-            subject_id=subject_id
-        ).count()
-        
-        attended_classes = Attendance.query.filter_by(
-            user_id=self.id, 
-            subject_id=subject_id,
-            status='present'
-        ).count()
+            Subject.branch.in_(self._semester_branch_codes())
+        ).order_by(Subject.id).all()
+    
+    def get_attendance_counts(self):
+        """Get {subject_id: (total_classes, attended_classes)} for the user in a single aggregate query"""
+        rows = db.session.query(
+            Attendance.subject_id,
+            func.count(Attendance.id),
+            func.sum(db.case((Attendance.status == 'present', 1), else_=0))
+        ).filter(
+            Attendance.user_id == self.id
+        ).group_by(Attendance.subject_id).all()
         
+        return {subject_id: (total, attended or 0) for subject_id, total, attended in rows}
+    
+    @staticmethod
+    def _attendance_summary(total_classes, attended_classes):
+        """Build the attendance statistics dict from raw class counts"""
         if total_classes == 0:
             return {
                 'total_classes': 0,
@@ -116,17 +119,29 @@ class User(UserMixin, db.Model):
             'status': 'good' if attendance_percentage >= 75 else 'warning' if attendance_percentage >= 60 else 'danger'
         }
     
-    def get_overall_attendance_stats(self):
-        """Get overall attendance statistics for the user"""
-        subjects = self.get_subjects_for_semester()
+    def get_attendance_for_subject(self, subject_id):
+        """Get attendance statistics for a specific subject"""
+        total_classes, attended_classes = db.session.query(
+            func.count(Attendance.id),
+            func.sum(db.case((Attendance.status == 'present', 1), else_=0))
+        ).filter(
+            Attendance.user_id == self.id,
+            Attendance.subject_id == subject_id
+        ).one()
+        
+        return self._attendance_summary(total_classes, attended_classes or 0)
+    
+    def get_overall_attendance_stats(self, subjects_data=None):
+        """Get overall attendance statistics for the user
         
-        total_classes_all = 0
-        attended_classes_all = 0
+        Pass the result of get_subjects_with_attendance() as subjects_data when it
+        has already been loaded to avoid querying the subjects and counts again.
+        """
+        if subjects_data is None:
+            subjects_data = self.get_subjects_with_attendance()
         
-        for subject in subjects:
-            attendance_data = self.get_attendance_for_subject(subject.id)
-            total_classes_all += attendance_data['total_classes']
-            attended_classes_all += attendance_data['attended_classes']
+        total_classes_all = sum(subject['total_classes'] for subject in subjects_data)
+        attended_classes_all = sum(subject['attended_classes'] for subject in subjects_data)
         
         if total_classes_all == 0:
             return {
@@ -165,11 +180,22 @@ class User(UserMixin, db.Model):
     
     def get_subjects_with_attendance(self):
         """Get subjects with their attendance data for the dashboard"""
-        subjects = self.get_subjects_for_semester()
+        # Runs on every dashboard request: lambda_stmt builds the statement once and
+        # binds semester/branch_codes as parameters. Only id, name and code are used,
+        # so fetch plain rows instead of Subject objects. Ordered by id so the
+        # semester/branch index doesn't regroup the subjects by branch
+        semester, branch_codes = self.semester, self._semester_branch_codes()
+        subjects = db.session.execute(lambda_stmt(
+            lambda: select(Subject.id, Subject.name, Subject.code).where(
+                Subject.semester == semester,
+                Subject.branch.in_(branch_codes)
+            ).order_by(Subject.id)
+        )).all()
+        attendance_counts = self.get_attendance_counts()
         subjects_data = []
         
         for subject in subjects:
-            attendance_data = self.get_attendance_for_subject(subject.id)
+            attendance_data = self._attendance_summary(*attendance_counts.get(subject.id, (0, 0)))
             
             subjects_data.append({
                 'id': subject.id,
@@ -191,6 +217,10 @@ class User(UserMixin, db.Model):
 class Subject(db.Model):
     """Model for storing subject information"""
     __tablename__ = 'subjects'
+    __table_args__ = (
+        # Serves the per-student semester/branch subject lookups
+        db.Index('ix_subject_semester_branch', 'semester', 'branch'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -252,6 +282,10 @@ class Enrollment(db.Model):
 class Attendance(db.Model):
     """Model for tracking student attendance per subject"""
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # One record per student, subject and day; also serves the per-user lookups and aggregates
+        db.Index('ix_attendance_user_subject_date', 'user_id', 'subject_id', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -402,6 +436,22 @@ def reset_database():
     drop_tables()
     create_tables()
 
+BRANCH_SUBJECTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'branch_subjects.json')
+
+@lru_cache(maxsize=1)
+def _parse_branch_subjects(path, mtime):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def load_branch_subjects():
+    """
+    Return the parsed branch_subjects.json, shared between callers.
+    The file is only re-read when its modification time changes, so edits are
+    still picked up without a restart. Raises FileNotFoundError if it is missing.
+    Callers must not mutate the returned data.
+    """
+    return _parse_branch_subjects(BRANCH_SUBJECTS_PATH, os.path.getmtime(BRANCH_SUBJECTS_PATH))
+
 def seed_subjects():
     """
     Seed and sync the database with branch-specific subjects from JSON data.
@@ -411,9 +461,6 @@ def seed_subjects():
     3. Removes subjects from DB that are no longer in the JSON (orphans).
     4. Aggressively cleans up dependent data (Attendance, etc.) for orphans.
     """
-    import json
-    import os
-    
     try:
         # First check if we can query the subjects table (if it has the branch column)
         test_query = Subject.query.first()
@@ -421,17 +468,25 @@ def seed_subjects():
         return
     
     # Load branch-specific subjects from JSON
-    json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'branch_subjects.json')
-    
     try:
-        with open(json_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        data = load_branch_subjects()
     except FileNotFoundError:
         return
     
     subjects_created = 0
     subjects_updated = 0
     active_subject_ids = set()
+    new_subjects = []
+    
+    # Load every subject once and match against in-memory lookups instead of
+    # issuing two SELECTs per JSON entry. Name matches keep every subject with
+    # that name/branch/semester in id order, so the first one is the row a
+    # query would have found
+    subjects_by_code = {}
+    subjects_by_name = {}
+    for subject in Subject.query.order_by(Subject.id).all():
+        subjects_by_code[subject.code] = subject
+        subjects_by_name.setdefault((subject.name, subject.branch, subject.semester), []).append(subject)
     
     # Iterate through branches and their semesters
     for branch_code, branch_data in data.get('branches', {}).items():
@@ -459,15 +514,12 @@ def seed_subjects():
                 
                 # Strategy:
                 # 1. Try to find by EXACT Code (Preferred)
-                existing = Subject.query.filter_by(code=tgt_code).first()
+                existing = subjects_by_code.get(tgt_code)
                 
                 # 2. If not found, try to find by Name + Branch + Semester (Rename/Recode Case)
                 if not existing:
-                    existing = Subject.query.filter_by(
-                        name=tgt_name,
-                        branch=branch_code, 
-                        semester=semester_int
-                    ).first()
+                    name_matches = subjects_by_name.get((tgt_name, branch_code, semester_int))
+                    existing = name_matches[0] if name_matches else None
                 
                 if not existing:
                     # Create New
@@ -480,15 +532,20 @@ def seed_subjects():
                         is_lab=tgt_is_lab
                     )
                     db.session.add(new_subject)
-                    db.session.flush() # Get ID
-                    active_subject_ids.add(new_subject.id)
+                    new_subjects.append(new_subject)
+                    subjects_by_code[tgt_code] = new_subject
+                    subjects_by_name.setdefault((tgt_name, branch_code, semester_int), []).append(new_subject)
                     subjects_created += 1
                 else:
                     # Update Existing
-                    active_subject_ids.add(existing.id)
+                    if existing.id is not None:
+                        active_subject_ids.add(existing.id)
+                    old_name_key = (existing.name, existing.branch, existing.semester)
                     changed = False
                     
                     if existing.code != tgt_code: # Critical: Updating Code
+                        subjects_by_code.pop(existing.code, None)
+                        subjects_by_code[tgt_code] = existing
                         existing.code = tgt_code
                         changed = True
                     if existing.name != tgt_name:
@@ -510,12 +567,22 @@ def seed_subjects():
                     if changed:
                         print(f"DEBUG: Updating {existing.code}")
                         subjects_updated += 1
+                        
+                        # Re-key the name lookup so later entries match the updated values
+                        new_name_key = (existing.name, existing.branch, existing.semester)
+                        if new_name_key != old_name_key:
+                            subjects_by_name[old_name_key].remove(existing)
+                            name_matches = subjects_by_name.setdefault(new_name_key, [])
+                            name_matches.append(existing)
+                            name_matches.sort(key=lambda subject: (subject.id is None, subject.id or 0))
     
     # Common subjects block removed to prevent duplicates with branch-specific subjects
     # The JSON file should now contain all subjects for all branches.
     
     # Commit additions and updates
     try:
+        db.session.flush() # Get IDs for the new subjects in one batch
+        active_subject_ids.update(subject.id for subject in new_subjects)
         db.session.commit()
     except Exception as e:
         print(f"Commit Error: {e}")
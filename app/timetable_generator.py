@@ -72,8 +72,8 @@ class TimetableGenerator:
 
         # 3. Check if we have classes assigned for the semesters
         # If no classes assigned, we can't make a timetable
-        count = AssignedClass.query.count()
-        if count == 0:
+        has_assignments = self.db.session.query(AssignedClass.query.exists()).scalar()
+        if not has_assignments:
             self.errors.append("No classes assigned. Please assign teachers to subjects first.")
             return False
             
@@ -220,8 +220,9 @@ class TimetableGenerator:
                         assigned_class_id=selected_cls.id
                     )
                     self.generated_entries.append(entry)
-                    self.db.session.add(entry)
         
+        # Hand the whole schedule to the session at once; the flush batches the INSERTs
+        self.db.session.add_all(self.generated_entries)
         try:
             self.db.session.commit()
             return True
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, redirect, make_response, url_for, flash, send_file
 from flask import render_template
 from flask_login import login_required, current_user, logout_user
-from .models import db, User, Branch, UserRole, Subject, AssignedClass, Enrollment, EnrollmentStatus, TimetableSettings, TimetableEntry
+from .models import db, User, Branch, UserRole, Subject, AssignedClass, Enrollment, EnrollmentStatus, TimetableSettings, TimetableEntry, load_branch_subjects
 from .timetable_generator import TimetableGenerator
 import json
 import os
@@ -9,6 +9,7 @@ import string
 import csv
 import io
 from datetime import datetime, timezone, time
+from sqlalchemy.orm import joinedload
 from .excel_export import generate_timetable_excel
 
 views = Blueprint('views', __name__)
@@ -39,15 +40,26 @@ def generate_acronym(name):
     return "".join([w[0].upper() for w in acronym_words])
 
 
+def get_assigned_classes_by_subject(subject_ids):
+    """Map subject id -> assigned classes (teachers eager-loaded) using a single query"""
+    classes_by_subject = {}
+    if not subject_ids:
+        return classes_by_subject
+
+    assigned_classes = AssignedClass.query.options(joinedload(AssignedClass.teacher)).filter(
+        AssignedClass.subject_id.in_(subject_ids)
+    ).order_by(AssignedClass.id).all()
+
+    for cls in assigned_classes:
+        classes_by_subject.setdefault(cls.subject_id, []).append(cls)
+    return classes_by_subject
+
+
 def load_semester_data():
     """Load branch-specific semester data from JSON file"""
-    json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'branch_subjects.json')
     try:
-        # Force fresh read of the file
-        with open(json_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        print(f"✅ Loaded fresh branch-specific JSON data - {len(data.get('branches', {}))} branches found")
-        return data
+        # Re-parsed only when the file changes on disk
+        return load_branch_subjects()
     except FileNotFoundError:
         print("❌ branch_subjects.json file not found, using fallback data")
         # Fallback data if JSON file not found
@@ -113,10 +125,6 @@ def student_dashboard():
     db_subjects_data = current_user.get_subjects_with_attendance()
     
     user_branch = current_user.branch.value if current_user.branch else 'CSE'
-    print(f"🔍 Debug Info for User: {current_user.name} (Semester {current_user.semester}) (Branch {user_branch})")
-    print(f"📊 Database subjects found: {len(db_subjects_data)}")
-    for db_subj in db_subjects_data:
-        print(f"   DB: {db_subj['code']} - {db_subj['name']}")
     
     # Merge database data with JSON data for icons and faculty
     subjects_data = []
@@ -125,7 +133,20 @@ def student_dashboard():
     branch_data = json_data.get('branches', {}).get(user_branch, {})
     semester_subjects = branch_data.get('semesters', {}).get(str(current_user.semester), [])
     
-    print(f"📚 JSON subjects found for {user_branch} Semester {current_user.semester}: {len(semester_subjects)}")
+    # Load assignments and this student's enrollments for all subjects up front
+    classes_by_subject = get_assigned_classes_by_subject([s['id'] for s in db_subjects_data])
+    class_ids = [cls.id for classes in classes_by_subject.values() for cls in classes]
+    enrollment_by_class = {}
+    if class_ids:
+        student_enrollments = Enrollment.query.filter(
+            Enrollment.student_id == current_user.id,
+            Enrollment.class_id.in_(class_ids)
+        ).order_by(Enrollment.id).all()
+        for enrollment in student_enrollments:
+            enrollment_by_class.setdefault(enrollment.class_id, enrollment)
+    
+    # Collected and reported in one write instead of a print per subject on every request
+    unmatched_codes = []
     
     for db_subject in db_subjects_data:
         # Find matching subject in JSON data (match by base code, ignoring branch prefix)
@@ -138,16 +159,14 @@ def student_dashboard():
                 break
         
         if not json_subject:
-            print(f"❌ No JSON match found for DB subject: {db_subject['code']}")
+            unmatched_codes.append(db_subject['code'])
         
         # Check Enrollment & Assignments
-        assigned_classes = AssignedClass.query.filter_by(subject_id=db_subject['id']).all()
+        assigned_classes = classes_by_subject.get(db_subject['id'], [])
         
         # Check if student is enrolled
-        user_enrollment = Enrollment.query.filter(
-            Enrollment.student_id == current_user.id,
-            Enrollment.class_id.in_([cls.id for cls in assigned_classes]) if assigned_classes else False
-        ).first()
+        subject_enrollments = [enrollment_by_class[cls.id] for cls in assigned_classes if cls.id in enrollment_by_class]
+        user_enrollment = min(subject_enrollments, key=lambda e: e.id) if subject_enrollments else None
         
         # Determine Faculty Name to display
         faculty_name = 'Not Assigned'
@@ -179,8 +198,11 @@ def student_dashboard():
         }
         subjects_data.append(merged_subject)
     
+    if unmatched_codes:
+        print(f"❌ No JSON match found for DB subjects: {', '.join(unmatched_codes)}")
+    
     # Get real attendance statistics
-    attendance_stats = current_user.get_overall_attendance_stats()
+    attendance_stats = current_user.get_overall_attendance_stats(db_subjects_data)
     
     # Use actual user data
     student_data = {
@@ -307,6 +329,8 @@ def curriculum():
     branch_data = json_data.get('branches', {}).get(user_branch, {})
     semester_subjects = branch_data.get('semesters', {}).get(str(current_user.semester), [])
     
+    classes_by_subject = get_assigned_classes_by_subject([s['id'] for s in db_subjects_data])
+    
     for db_subject in db_subjects_data:
         # Find matching subject in JSON data
         json_subject = None
@@ -319,7 +343,7 @@ def curriculum():
         
         # Try to find assigned faculty from database
         # This fixes the "faculty name not updating" issue by preferring DB data over JSON
-        assigned_classes_list = AssignedClass.query.filter_by(subject_id=db_subject['id']).all()
+        assigned_classes_list = classes_by_subject.get(db_subject['id'], [])
         
         faculty_name = "Not Assigned"
         if assigned_classes_list:
@@ -410,7 +434,7 @@ def attendance():
         subjects_data.append(merged_subject)
     
     # Get real attendance statistics
-    attendance_stats = current_user.get_overall_attendance_stats()
+    attendance_stats = current_user.get_overall_attendance_stats(db_subjects_data)
     
     # Generate missed classes data from actual attendance
     missed_classes = []
@@ -917,8 +941,8 @@ def teacher_schedule():
     active_sem_type = settings.active_semester_type if settings else 'odd'
     sem_group = request.args.get('group', active_sem_type) 
     
-    # Get teacher's assigned class IDs
-    my_classes = AssignedClass.query.filter_by(teacher_id=current_user.id).all()
+    # Get teacher's assigned class IDs (subjects eager-loaded; the grid shows each entry's subject)
+    my_classes = AssignedClass.query.options(joinedload(AssignedClass.subject)).filter_by(teacher_id=current_user.id).all()
     class_ids = [c.id for c in my_classes]
     
     # Get entries filtered by teacher's classes AND semester parity
@@ -1082,6 +1106,7 @@ def teacher_mark_attendance(class_id):
         from .models import Attendance
         
         count = 0
+        recorded_at = datetime.now(timezone.utc)
         for enrollment in enrollments:
             student = enrollment.student
             # Check form data: 'attendance_<student_id>' -> 'on' (present) or missing (absent)
@@ -1107,7 +1132,8 @@ def teacher_mark_attendance(class_id):
                     subject_id=assigned_class.subject_id,
                     date=date_obj,
                     status=status,
-                    class_type=class_type
+                    class_type=class_type,
+                    recorded_at=recorded_at
                 )
                 db.session.add(new_record)
             count += 1
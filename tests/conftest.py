@@ -1,40 +1,214 @@
 import sys
 import os
 import pytest
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
 from flask import Flask
 
 # Add project root to path so tests can import app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, orm
+from sqlalchemy.pool import StaticPool
+from werkzeug.security import generate_password_hash
+
+from app import create_app, models, views
 from app.models import db as _db, User, UserRole
 
+
+class TestSession(Session):
+    """Session that honours an explicit ``bind``.
+
+    Flask-SQLAlchemy's session always resolves the app engine, so without this
+    the per-test session would bypass the connection holding the outer transaction.
+    """
+    __test__ = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            return self.bind
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
 @pytest.fixture(scope='session')
 def app():
     """Create application for the tests."""
-    # Force in-memory database configuration BEFORE creating app
-    # to prevent create_app() from touching the real database file
-    os.environ['DATABASE_URL'] = "sqlite:///:memory:"
-       
-    app = create_app()
-    app.config.update({
+    # Passed to create_app() so the in-memory database is configured before
+    # the engine is created and the real database file is never touched
+    app = create_app({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
-        "WTF_CSRF_ENABLED": False  # Disable CSRF for easier testing
+        # Every session must share the one connection that holds the in-memory database
+        "SQLALCHEMY_ENGINE_OPTIONS": {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        },
+        "WTF_CSRF_ENABLED": False,  # Disable CSRF for easier testing
+        # Compiled templates never change during a run; don't stat them on every render
+        "TEMPLATES_AUTO_RELOAD": False,
     })
-    
+    app.jinja_env.auto_reload = False
+
     yield app
 
-@pytest.fixture(scope='function')
-def db(app):
+@lru_cache(maxsize=None)
+def _test_password_hash(password):
+    # check_password_hash() reads the method and iteration count from the stored
+    # hash, so a single-round PBKDF2 hash also makes every test login cheap
+    return generate_password_hash(password, method='pbkdf2:sha256:1')
+
+@pytest.fixture(scope='session', autouse=True)
+def cached_password_hashes():
     """
-    Create a fresh database for each test.
+    Hash each distinct test password only once, with a single PBKDF2 round.
+
+    The suite creates dozens of users with the same few passwords and every
+    set_password() call would otherwise run a full scrypt hash. A reused salted
+    hash still verifies normally in check_password().
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(models, 'generate_password_hash', _test_password_hash)
+        yield
+
+@pytest.fixture(scope='session', autouse=True)
+def cached_calendar_events():
+    """
+    Parse data/calendar_events.json once for the session instead of on every
+    dashboard, attendance and calendar request. The views only read the result.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(views, 'load_calendar_events', lru_cache(maxsize=1)(views.load_calendar_events))
+        yield
+
+@pytest.fixture(scope='session')
+def db_engine(app):
+    """
+    Create the schema once for the whole test session.
     """
     with app.app_context():
+        engine = _db.engine
+
+        # pysqlite handles BEGIN itself and breaks SAVEPOINTs; let SQLAlchemy emit it.
+        # The test database is throwaway, so also skip syncs and keep the journal
+        # and temp tables in memory.
+        @event.listens_for(engine, "connect")
+        def _configure_test_connection(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA journal_mode=MEMORY")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def _emit_begin(conn):
+            conn.exec_driver_sql("BEGIN")
+
+        # Reconnect so the listeners apply (this replaces the in-memory database)
+        engine.dispose()
         _db.create_all()
-        yield _db
-        _db.session.remove()
-        _db.drop_all()
+
+    yield engine
+
+@pytest.fixture(scope='module')
+def seed_session(db_engine):
+    """
+    Session for rows shared by every test in a module.
+
+    Rows committed here are visible to each test, and any changes a test makes
+    to them are still rolled back by the db fixture. All tables are emptied
+    again once the module finishes.
+    """
+    # Keep ids loaded after commit; a refresh would hold the shared connection open
+    with orm.Session(db_engine, expire_on_commit=False) as session:
+        yield session
+
+    with db_engine.begin() as connection:
+        for table in reversed(_db.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+@contextmanager
+def _rolled_back_db(app, db_engine):
+    """
+    Bind ``db.session`` to a transaction that is rolled back on exit.
+
+    Commits from tests and views only release a SAVEPOINT, so the schema is
+    shared across tests but no rows leak from one test into the next.
+    """
+    with app.app_context():
+        connection = db_engine.connect()
+        transaction = connection.begin()
+        session = _db._make_scoped_session({
+            "class_": TestSession,
+            "bind": connection,
+            "join_transaction_mode": "create_savepoint",
+            # Don't re-SELECT loaded rows on the next attribute access after a
+            # commit. Views share this session, so an instance can still hold
+            # values that were never stored: tests that check what was saved
+            # reload the row with populate_existing or select the columns
+            "expire_on_commit": False,
+        })
+        original_session, _db.session = _db.session, session
+        try:
+            yield _db
+        finally:
+            session.remove()
+            _db.session = original_session
+            transaction.rollback()
+            connection.close()
+
+@pytest.fixture(scope='session')
+def rolled_back_db(app, db_engine):
+    """
+    Context manager factory for work shared by several tests, such as running
+    an expensive operation once per module. Nothing it writes survives the block.
+    """
+    return lambda: _rolled_back_db(app, db_engine)
+
+@pytest.fixture(scope='function')
+def db(app, db_engine):
+    """Run each test inside a transaction that is rolled back afterwards."""
+    with _rolled_back_db(app, db_engine) as test_db:
+        yield test_db
+
+@pytest.fixture
+def user_factory(db):
+    """Return a helper that builds a user with a hashed password and adds it to the test session."""
+    def make_user(name, email, role=UserRole.STUDENT, password='password', **kwargs):
+        user = User(name=name, email=email, role=role, **kwargs)
+        user.set_password(password)
+        db.session.add(user)
+        return user
+    return make_user
+
+@pytest.fixture
+def freeze_view_time(monkeypatch):
+    """Return a helper that pins datetime.now() inside app.views to a fixed moment."""
+    def freeze(moment):
+        # Subclass the real datetime so strptime, combine etc. keep working
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return moment if tz is None else moment.replace(tzinfo=tz)
+        monkeypatch.setattr(views, 'datetime', FrozenDatetime)
+    return freeze
+
+@pytest.fixture
+def capture_sql(db):
+    """Return a context manager that collects the SQL statements run inside it."""
+    @contextmanager
+    def capture():
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return capture
 
 @pytest.fixture
 def client(app, db):
@@ -53,6 +227,12 @@ def auth(client):
         def login(self, email='test@example.com', password='password'):
             return client.post('/auth/login', data={'email': email, 'password': password}, follow_redirects=True)
 
+        def login_as(self, user_id):
+            """Log in by writing the Flask-Login session directly, skipping the login request."""
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+                session['_fresh'] = True
+
         def logout(self):
             return client.get('/logout', follow_redirects=True)
             
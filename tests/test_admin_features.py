@@ -1,183 +1,221 @@
 import pytest
 import io
+from zipfile import is_zipfile
 from app.models import User, UserRole, TimetableEntry, TimetableSettings, AssignedClass, Subject, Branch, Enrollment, db
 from app.excel_export import generate_timetable_excel
+from app.timetable_generator import TimetableGenerator
 from flask import url_for
-from datetime import time, datetime, timezone
+from datetime import date, time, datetime, timezone
+from types import SimpleNamespace
+
+@pytest.fixture(scope='module')
+def seed_ids(seed_session):
+    """
+    Insert the standard admin, teacher, student, subject setup once for the module.
+
+    Only primary keys are returned; each test loads the instances it needs
+    through its own session.
+    """
+    admin = User(name="Admin", email="admin@test.com", role=UserRole.ADMIN)
+    admin.set_password("password")
+    
+    teacher = User(name="Teacher", email="teacher@test.com", role=UserRole.TEACHER)
+    teacher.set_password("password")
+    
+    student = User(name="Student", email="student@test.com", role=UserRole.STUDENT)
+    student.set_password("password")
+    
+    subject = Subject(name="Math", code="CSE-101", semester=1, branch="CSE")
+    subject2 = Subject(name="Physics", code="ME-101", semester=1, branch="ME")
+    
+    # Base Assignment
+    assignment = AssignedClass(teacher=teacher, subject=subject, section='A')
+    assignment2 = AssignedClass(teacher=teacher, subject=subject2)
+    
+    # Timetable Settings
+    settings = TimetableSettings(
+        active_semester_type='odd',
+        start_time=time(9, 0), end_time=time(17, 0), lunch_duration=60, periods=8
+    )
+    
+    # Timetable Entry
+    entry1 = TimetableEntry(
+        assigned_class=assignment, day="Monday", period_number=1, start_time=time(9,0), end_time=time(10,0), semester=1, branch="CSE"
+    )
+    
+    seed_session.add_all([admin, teacher, student, subject, subject2, assignment, assignment2, settings, entry1])
+    seed_session.commit()
+    
+    return SimpleNamespace(
+        admin_id=admin.id, teacher_id=teacher.id, student_id=student.id,
+        subject_id=subject.id, subject2_id=subject2.id,
+        assignment_id=assignment.id, assignment2_id=assignment2.id,
+        settings_id=settings.id, entry1_id=entry1.id
+    )
+
+@pytest.fixture(scope='class')
+def admin_client(app, seed_ids):
+    """A test client logged in as the seeded admin once for the whole class."""
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'admin@test.com', 'password': 'password'})
+    return client
 
 # --- Admin Feature Tests ---
+@pytest.mark.xdist_group(name="admin_features")
 class TestAdminFeatures:
     
     @pytest.fixture(autouse=True)
-    def setup(self, db, client):
-        # Create standard admin, teacher, student, subject setup
-        self.admin = User(name="Admin", email="admin@test.com", role=UserRole.ADMIN)
-        self.admin.set_password("password")
-        
-        self.teacher = User(name="Teacher", email="teacher@test.com", role=UserRole.TEACHER)
-        self.teacher.set_password("password")
-        
-        self.student = User(name="Student", email="student@test.com", role=UserRole.STUDENT)
-        self.student.set_password("password")
-        
-        self.subject = Subject(name="Math", code="CSE-101", semester=1, branch="CSE")
-        self.subject2 = Subject(name="Physics", code="ME-101", semester=1, branch="ME")
-        
-        db.session.add_all([self.admin, self.teacher, self.student, self.subject, self.subject2])
-        db.session.commit()
-        
-        # Base Assignment
-        self.assignment = AssignedClass(teacher_id=self.teacher.id, subject_id=self.subject.id, section='A')
-        self.assignment2 = AssignedClass(teacher_id=self.teacher.id, subject_id=self.subject2.id)
-        db.session.add_all([self.assignment, self.assignment2])
-        db.session.commit()
-        
-        # Timetable Settings
-        self.settings = TimetableSettings(
-            active_semester_type='odd',
-            start_time=time(9, 0), end_time=time(17, 0), lunch_duration=60, periods=8
-        )
-        db.session.add(self.settings)
-        
-        # Timetable Entry
-        self.entry1 = TimetableEntry(
-            assigned_class=self.assignment, day="Monday", period_number=1, start_time=time(9,0), end_time=time(10,0), semester=1, branch="CSE"
-        )
-        db.session.add(self.entry1)
-        db.session.commit()
-
-    def login_admin(self, client):
-        return client.post('/auth/login', data={'email': 'admin@test.com', 'password': 'password'}, follow_redirects=True)
+    def setup(self, db, admin_client, seed_ids):
+        self.ids = seed_ids
+        # Drop flash messages a previous test left unread in the shared session
+        with admin_client.session_transaction() as session:
+            session.pop('_flashes', None)
 
     # --- Basic Admin Views ---
-    def test_admin_dashboard_access(self, client):
-        self.login_admin(client)
-        response = client.get('/admin/dashboard')
+    def test_admin_dashboard_access(self, admin_client):
+        response = admin_client.get('/admin/dashboard')
         assert response.status_code == 200
         assert b"Admin" in response.data or b"Dashboard" in response.data
 
-    def test_admin_add_user(self, client, db):
-        self.login_admin(client)
-        data = {
-            'name': 'New User', 'email': 'new@test.com', 'role': 'STUDENT',
-            'password': 'password123', 'phone': '1234567890',
-            'semester': '1', 'student_branch': 'CSE'
-        }
-        response = client.post('/admin/add_user', data=data, follow_redirects=True)
+    @pytest.mark.parametrize("data, expected", [
+        (
+            {
+                'name': 'New User', 'email': 'new@test.com', 'role': 'STUDENT',
+                'password': 'password123', 'phone': '1234567890',
+                'semester': '1', 'student_branch': 'CSE'
+            },
+            {'role': UserRole.STUDENT}
+        ),
+        (
+            {
+                'name': 'Detail Teacher',
+                'email': 'detail@teacher.com',
+                'role': 'TEACHER',
+                'password': 'password123',
+                'teacher_branch': 'CSE',
+                'teacher_institution': 'IIT Test',
+                'teacher_department': 'CS Dept',
+                'teacher_dob': '1980-01-01'
+            },
+            {
+                'role': UserRole.TEACHER, 'branch': Branch.CSE, 'institution': 'IIT Test',
+                'department': 'CS Dept', 'date_of_birth': date(1980, 1, 1)
+            }
+        ),
+    ])
+    def test_admin_add_user(self, admin_client, db, data, expected):
+        response = admin_client.post('/admin/add_user', data=data, follow_redirects=True)
         assert response.status_code == 200
         assert b"added successfully" in response.data
         
-        user = User.query.filter_by(email='new@test.com').first()
-        assert user.role == UserRole.STUDENT
+        user = User.query.filter_by(email=data['email']).populate_existing().first()
+        assert user is not None
+        for field, value in expected.items():
+            assert getattr(user, field) == value
 
-    def test_admin_edit_user(self, client, db):
-        self.login_admin(client)
+    def test_admin_edit_user(self, admin_client, db):
         data = {'name': 'Updated Student', 'phone': '9876543210', 'semester': '2', 'branch': 'CSE'}
-        response = client.post(f'/admin/edit_user/{self.student.id}', data=data, follow_redirects=True)
-        assert response.status_code == 200
+        response = admin_client.post(f'/admin/edit_user/{self.ids.student_id}', data=data)
+        assert response.status_code == 302
         
-        updated_student = db.session.get(User, self.student.id)
+        updated_student = db.session.get(User, self.ids.student_id, populate_existing=True)
         assert updated_student.name == 'Updated Student'
         assert updated_student.semester == 2
 
     # --- Class Management ---
-    def test_admin_assign_class(self, client, db):
-        self.login_admin(client)
+    def test_admin_assign_class(self, admin_client, db):
         # Create a fresh subject
         new_subject = Subject(name="New Subject", code="NEW-101", semester=1, branch="CSE")
         db.session.add(new_subject)
-        db.session.commit()
+        db.session.flush()
         
-        data = {'teacher_id': self.teacher.id, 'subject_ids': [new_subject.id], 'section': 'B'}
+        data = {'teacher_id': self.ids.teacher_id, 'subject_ids': [new_subject.id], 'section': 'B'}
         
-        response = client.post('/admin/assign_class', data=data, follow_redirects=True)
+        response = admin_client.post('/admin/assign_class', data=data, follow_redirects=True)
         assert response.status_code == 200
         assert b"Successfully assigned" in response.data
         
-        assignment = AssignedClass.query.filter_by(teacher_id=self.teacher.id, subject_id=new_subject.id, section='B').first()
+        assignment = AssignedClass.query.filter_by(teacher_id=self.ids.teacher_id, subject_id=new_subject.id, section='B').first()
         assert assignment is not None
 
-    def test_admin_delete_assignment(self, client, db):
-        self.login_admin(client)
-        assign = AssignedClass(teacher_id=self.teacher.id, subject_id=self.subject.id, section='Z')
+    def test_admin_delete_assignment(self, admin_client, db):
+        assign = AssignedClass(teacher_id=self.ids.teacher_id, subject_id=self.ids.subject_id, section='Z')
         db.session.add(assign)
-        db.session.commit()
+        db.session.flush()
         
-        response = client.post(f'/admin/delete_assignment/{assign.id}', follow_redirects=True)
-        assert response.status_code == 200
+        response = admin_client.post(f'/admin/delete_assignment/{assign.id}')
+        assert response.status_code == 302
         assert db.session.get(AssignedClass, assign.id) is None
 
     # --- Semester Toggle Feature ---
-    def test_admin_toggle_route(self, client, db):
-        self.login_admin(client)
+    def test_admin_toggle_route(self, admin_client, db):
         
         # Toggle to EVEN
-        client.post('/admin/timetable', data={'action': 'toggle_semester', 'semester_type': 'even'}, follow_redirects=True)
-        settings = TimetableSettings.query.first()
+        admin_client.post('/admin/timetable', data={'action': 'toggle_semester', 'semester_type': 'even'})
+        settings = TimetableSettings.query.populate_existing().first()
         assert settings.active_semester_type == 'even'
         
         # Toggle back to ODD
-        client.post('/admin/timetable', data={'action': 'toggle_semester', 'semester_type': 'odd'}, follow_redirects=True)
-        settings = TimetableSettings.query.first()
+        admin_client.post('/admin/timetable', data={'action': 'toggle_semester', 'semester_type': 'odd'})
+        settings = TimetableSettings.query.populate_existing().first()
         assert settings.active_semester_type == 'odd'
 
     # --- Timetable Export Feature ---
-    def test_excel_generator_function(self):
-        entries_by_branch = {"CSE": [self.entry1]}
+    def test_excel_generator_function(self, db):
+        entries_by_branch = {"CSE": [db.session.get(TimetableEntry, self.ids.entry1_id)]}
         excel_io = generate_timetable_excel(entries_by_branch)
         assert isinstance(excel_io, io.BytesIO)
-        
-        from zipfile import ZipFile, is_zipfile
         assert is_zipfile(excel_io)
 
-    def test_download_timetable_excel(self, client):
-        self.login_admin(client)
-        response = client.get('/admin/timetable/download?format=excel&branch=all')
+    def test_download_timetable_excel(self, admin_client, monkeypatch):
+        # The workbook itself is covered by test_excel_generator_function; here we
+        # only check that the view groups entries and serves the file
+        exported = {}
+        def fake_generate(entries_by_branch):
+            exported.update(entries_by_branch)
+            return io.BytesIO(b"xlsx")
+        monkeypatch.setattr('app.views.generate_timetable_excel', fake_generate)
+        
+        response = admin_client.get('/admin/timetable/download?format=excel&branch=all')
         assert response.status_code == 200
         assert response.headers['Content-Type'] == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        assert response.data == b"xlsx"
+        assert [entry.id for entry in exported["CSE"]] == [self.ids.entry1_id]
 
-    def test_download_timetable_pdf(self, client):
-        self.login_admin(client)
-        response = client.get('/admin/timetable/download?format=pdf&branch=all')
+    def test_download_timetable_pdf(self, admin_client):
+        response = admin_client.get('/admin/timetable/download?format=pdf&branch=all')
         assert response.status_code == 200
         assert b"CSE" in response.data
 
-    def test_download_no_data(self, client):
-        self.login_admin(client)
-        response = client.get('/admin/timetable/download?format=excel&branch=Civil')
+    def test_download_no_data(self, admin_client):
+        response = admin_client.get('/admin/timetable/download?format=excel&branch=Civil')
         assert response.status_code == 302
 
     # --- New Tests Added ---
 
-    def test_delete_user_success(self, client, db):
-        self.login_admin(client)
+    def test_delete_user_success(self, admin_client, db):
         user_to_delete = User(name="ToDelete", email="del@t.com", role=UserRole.STUDENT)
         user_to_delete.set_password("pass")
         db.session.add(user_to_delete)
-        db.session.commit()
+        db.session.flush()
         
-        response = client.post(f'/admin/delete_user/{user_to_delete.id}', follow_redirects=True)
-        assert b"deleted successfully" in response.data or response.status_code == 200
+        response = admin_client.post(f'/admin/delete_user/{user_to_delete.id}')
+        assert response.status_code == 302
         assert db.session.get(User, user_to_delete.id) is None
 
-    def test_delete_self_fails(self, client):
-        self.login_admin(client)
-        # Assuming we can get current user id from helper or context
-        from flask_login import current_user
-        # We need a request context to access current_user, but we can just use the checks in the view
-        # The view checks if user_id == current_user.id
-        admin = User.query.filter_by(email="admin@test.com").first()
-        response = client.post(f'/admin/delete_user/{admin.id}', follow_redirects=True)
+    def test_delete_self_fails(self, admin_client):
+        # The view checks if user_id == current_user.id; the seeded admin is the one logged in
+        response = admin_client.post(f'/admin/delete_user/{self.ids.admin_id}', follow_redirects=True)
         assert b"cannot delete your own account" in response.data
 
-    def test_delete_nonexistent_user(self, client):
-        self.login_admin(client)
-        response = client.post('/admin/delete_user/99999', follow_redirects=True)
-        assert response.status_code in [404, 500, 200]
-        # If it's a 404 handler, it might return 404 status or custom page
+    def test_delete_nonexistent_user(self, admin_client):
+        response = admin_client.post('/admin/delete_user/99999')
+        assert response.status_code == 404
 
-    def test_timetable_generate_post_valid(self, client):
-        self.login_admin(client)
+    def test_timetable_generate_post_valid(self, admin_client, db, monkeypatch):
+        # The scheduling algorithm is covered in test_timetable_engine; here we
+        # only check that the POST is saved and handed to the generator
+        monkeypatch.setattr(TimetableGenerator, 'generate_schedule', lambda self: True)
         data = {
             'action': 'generate',
             'start_time': '09:00',
@@ -188,74 +226,34 @@ class TestAdminFeatures:
             'periods': '8',
             'working_days': ['Monday', 'Tuesday']
         }
-        # This will call the algorithm which might be slow or fail if data isn't perfect,
-        # but we check if it handles the POST correctly.
-        response = client.post('/admin/timetable', data=data, follow_redirects=True)
+        response = admin_client.post('/admin/timetable', data=data, follow_redirects=True)
         assert response.status_code == 200
-        # Expecting either success or generation error message
-        assert b"Timetable generated successfully" in response.data or b"Generation failed" in response.data
+        assert b"Timetable generated successfully" in response.data
+        
+        settings = db.session.get(TimetableSettings, self.ids.settings_id, populate_existing=True)
+        assert settings.end_time == time(16, 0)
+        assert settings.working_days == 'Monday,Tuesday'
 
-    def test_timetable_generate_post_invalid_time(self, client):
-        self.login_admin(client)
+    def test_timetable_generate_post_invalid_time(self, admin_client):
         data = {
             'action': 'generate',
             'start_time': 'INVALID', # Should fallback to default
             'periods': '8'
         }
-        response = client.post('/admin/timetable', data=data, follow_redirects=True)
-        assert response.status_code == 200
-
-    def test_admin_delete_subject(self, client, db):
-        self.login_admin(client)
-        sub = Subject(name="ToDel", code="D1", semester=1, branch="CSE")
-        db.session.add(sub)
-        db.session.commit()
-        
-        # Look for delete endpoint or assume managing subjects is part of curriculum or settings
-        # If no explicit delete endpoint in views shown, we skip or check if available
-        # Based on file structure, might be in 'settings.html' or similar
-        # If unavailable, we'll verify via DB admin panel simulation if that existed, 
-        # but for now let's just create a dummy one if the route exists.
-        # Checking views.py... there is usually a delete subject route?
-        # If not visible in summary, maybe skipped. I will try a standard convention route.
-        response = client.post(f'/admin/delete_subject/{sub.id}', follow_redirects=True)
-        if response.status_code != 404:
-             assert db.session.get(Subject, sub.id) is None
+        response = admin_client.post('/admin/timetable', data=data)
+        assert response.status_code == 302
 
-    def test_admin_edit_user_invalid(self, client):
-        self.login_admin(client)
+    def test_admin_edit_user_invalid(self, admin_client, db):
         # Try to update with existing email of another user
         u2 = User(name="U2", email="u2@test.com", role=UserRole.STUDENT)
         u2.set_password("pass")
         db.session.add(u2)
-        db.session.commit()
+        db.session.flush()
         
-        # Try to change self.student's email to u2@test.com
+        # Try to change the seeded student's email to u2@test.com
         data = {'name': 'Updated', 'email': 'u2@test.com', 'role': 'STUDENT'}
-        response = client.post(f'/admin/edit_user/{self.student.id}', data=data, follow_redirects=True)
-        # Should likely fail or show error
-        assert b"Email already exists" in response.data or b"integrity" in response.data.lower() or response.status_code == 200
-
-    def test_add_teacher_with_details(self, client, db):
-        self.login_admin(client)
-        data = {
-            'name': 'Detail Teacher',
-            'email': 'detail@teacher.com',
-            'role': 'TEACHER',
-            'password': 'password123',
-            'teacher_branch': 'CSE',
-            'teacher_institution': 'IIT Test',
-            'teacher_department': 'CS Dept',
-            'teacher_dob': '1980-01-01'
-        }
-        
-        response = client.post('/admin/add_user', data=data, follow_redirects=True)
-        assert response.status_code == 200
-        assert b"added successfully" in response.data
-        
-        t = User.query.filter_by(email='detail@teacher.com').first()
-        assert t is not None
-        assert t.branch == Branch.CSE
-        assert t.institution == 'IIT Test'
-        assert t.department == 'CS Dept'
-        assert str(t.date_of_birth) == '1980-01-01'
+        response = admin_client.post(f'/admin/edit_user/{self.ids.student_id}', data=data)
+        # Email is read-only in the edit view, so the update succeeds without touching it
+        assert response.status_code == 302
+        assert db.session.get(User, self.ids.student_id, populate_existing=True).email == 'student@test.com'
+        assert db.session.get(User, u2.id, populate_existing=True).email == 'u2@test.com'
@@ -1,9 +1,13 @@
 import pytest
-from app.models import User, UserRole, Branch, Subject, Attendance, Marks, Enrollment, AssignedClass
+import sqlalchemy
+from sqlalchemy import insert
+from app import models
+from app.models import User, UserRole, Branch, Subject, Attendance, Marks, Enrollment, AssignedClass, seed_subjects
 from flask import url_for
 from datetime import date, datetime, timezone
 
 # --- Auth Tests ---
+@pytest.mark.xdist_group(name="auth")
 class TestAuth:
     def test_login_page_load(self, client):
         """Test login page loads successfully"""
@@ -11,16 +15,21 @@ class TestAuth:
         assert response.status_code == 200
         assert b"Login" in response.data
 
-    def test_login_success(self, client, auth, db):
-        """Test successful login"""
-        user = User(name="Test User", email="test@example.com", role=UserRole.STUDENT)
+    @pytest.mark.parametrize("name, email, role, expected", [
+        ("Test User", "test@example.com", UserRole.STUDENT, b"Welcome back, Test User!"),
+        # Admins are redirected to the admin dashboard
+        ("Admin", "admin@example.com", UserRole.ADMIN, b"Admin"),
+    ])
+    def test_login_success(self, client, auth, db, name, email, role, expected):
+        """Test successful login lands on the role's dashboard"""
+        user = User(name=name, email=email, role=role)
         user.set_password("password")
         db.session.add(user)
         db.session.commit()
 
-        response = auth.login("test@example.com", "password")
+        response = auth.login(email, "password")
         assert response.status_code == 200
-        assert b"Welcome back, Test User!" in response.data
+        assert expected in response.data
 
     def test_login_failure(self, client, auth, db):
         """Test login with wrong password"""
@@ -33,17 +42,6 @@ class TestAuth:
         assert response.status_code == 200
         assert b"Invalid email or password" in response.data
 
-    def test_admin_login_redirect(self, client, auth, db):
-        """Test admin redirects to admin dashboard"""
-        user = User(name="Admin", email="admin@example.com", role=UserRole.ADMIN)
-        user.set_password("password")
-        db.session.add(user)
-        db.session.commit()
-
-        response = auth.login("admin@example.com", "password")
-        assert response.status_code == 200
-        assert b"Admin" in response.data or b"Dashboard" in response.data
-
     def test_logout(self, client, auth, db):
         """Test logout functionality"""
         user = User(name="User", email="user@example.com")
@@ -52,10 +50,11 @@ class TestAuth:
         db.session.commit()
 
         auth.login()
-        response = client.get('/auth/logout', follow_redirects=True)       
-        assert response.status_code == 200
+        response = client.get('/auth/logout')
+        assert response.status_code == 302
 
 # --- Security Tests ---
+@pytest.mark.xdist_group(name="security")
 class TestSecurity:
     def test_student_cannot_access_admin(self, client, auth, db):
         """Test RBAC: Student cannot access admin dashboard"""
@@ -80,6 +79,7 @@ class TestSecurity:
         assert response.status_code in [403, 401, 302]
 
 # --- Models Tests ---
+@pytest.mark.xdist_group(name="models")
 class TestModels:
     def test_user_creation(self, db):
         """Test user creation and password hashing"""
@@ -114,8 +114,9 @@ class TestModels:
         user.institution = "New Inst"
         db.session.commit()
         
-        fetched = db.session.get(User, user.id)
-        assert fetched.institution == "New Inst"
+        assert db.session.execute(
+            sqlalchemy.select(User.institution).where(User.id == user.id)
+        ).scalar_one() == "New Inst"
 
     def test_attendance_stats_calculation(self, db):
         """Test attendance percentage calculation logic"""
@@ -126,13 +127,12 @@ class TestModels:
         db.session.add(subject)
         db.session.commit()
 
-        records = [
-            Attendance(user_id=user.id, subject_id=subject.id, date=date(2023, 1, 1), status='present'),
-            Attendance(user_id=user.id, subject_id=subject.id, date=date(2023, 1, 2), status='present'),
-            Attendance(user_id=user.id, subject_id=subject.id, date=date(2023, 1, 3), status='present'),
-            Attendance(user_id=user.id, subject_id=subject.id, date=date(2023, 1, 4), status='absent'),
-        ]
-        db.session.add_all(records)
+        # One executemany INSERT instead of a unit-of-work flush per record
+        statuses = ['present', 'present', 'present', 'absent']
+        db.session.execute(insert(Attendance), [
+            {'user_id': user.id, 'subject_id': subject.id, 'date': date(2023, 1, day), 'status': status}
+            for day, status in enumerate(statuses, start=1)
+        ])
         db.session.commit()
 
         stats = user.get_attendance_for_subject(subject.id)
@@ -169,18 +169,16 @@ class TestModels:
         u1 = User(name="User 1", email="duplicate@test.com", role=UserRole.STUDENT)
         u1.set_password("password")
         db.session.add(u1)
-        db.session.commit()
+        db.session.flush()
+        assert User.query.filter_by(email="duplicate@test.com").first() is not None
         
-        # Try to signup with same email via POST (simulating signup form if available or direct creation)
-        # Note: If signup is not public, we check logic or admin creation
-        # Assuming admin creation or similar logic exists, or just DB integrity
+        # Signup is not public, so check the unique constraint directly.
+        # flush() is enough to hit it and leaves the per-test transaction to the fixture.
         u2 = User(name="User 2", email="duplicate@test.com", role=UserRole.STUDENT)
         u2.set_password("password")
         db.session.add(u2)
-        import sqlalchemy
         with pytest.raises(sqlalchemy.exc.IntegrityError):
-            db.session.commit()
-        db.session.rollback()
+            db.session.flush()
 
     def test_login_nonexistent_user(self, auth):
         response = auth.login("ghost@test.com", "password")
@@ -198,4 +196,55 @@ class TestModels:
         db.session.add(u)
         db.session.commit()
         # Verify checking empty password matches
-        assert u.check_password("") 
+        assert u.check_password("")
+
+# --- Subject Sync Tests ---
+@pytest.mark.xdist_group(name="models")
+class TestSubjectSync:
+    BRANCH_SUBJECTS = {
+        "branches": {
+            "CSE": {
+                "semesters": {
+                    "1": [
+                        {"code": "CS101", "name": "Programming", "credits": 4},
+                        {"code": "CS102", "name": "Data Structures", "credits": 3, "is_lab": True},
+                    ]
+                }
+            }
+        }
+    }
+
+    def test_seed_subjects_sync(self, db, monkeypatch, capsys):
+        """Test that seeding creates, recodes and removes subjects, and a re-sync changes nothing"""
+        monkeypatch.setattr(models, 'load_branch_subjects', lambda: self.BRANCH_SUBJECTS)
+
+        # Same name/branch/semester as CS101 under an old code, plus a subject no longer in the JSON
+        recoded = Subject(name="Programming", code="CSE-OLD101", semester=1, branch="CSE", credits=4)
+        orphan = Subject(name="Retired", code="CSE-RET", semester=1, branch="CSE")
+        student = User(name="Student", email="student@example.com", semester=1)
+        student.set_password("pass")
+        db.session.add_all([recoded, orphan, student])
+        db.session.flush()
+        db.session.add(Attendance(user_id=student.id, subject_id=orphan.id, date=date(2023, 1, 2), status='present'))
+        db.session.commit()
+
+        seed_subjects()
+        assert "Created 1, Updated 1, Deleted 1" in capsys.readouterr().out
+
+        stored = db.session.execute(
+            sqlalchemy.select(Subject.id, Subject.code, Subject.name, Subject.credits, Subject.is_lab).order_by(Subject.code)
+        ).all()
+        assert [tuple(row[1:]) for row in stored] == [
+            ("CSE-CS101", "Programming", 4, False),
+            ("CSE-CS102", "Data Structures", 3, True),
+        ]
+        # The recode kept the existing row, and the orphan took its attendance with it
+        assert stored[0].id == recoded.id
+        assert db.session.scalar(sqlalchemy.select(sqlalchemy.func.count(Attendance.id))) == 0
+
+        # Syncing the same JSON again finds nothing to change
+        seed_subjects()
+        assert capsys.readouterr().out == ""
+        assert db.session.execute(
+            sqlalchemy.select(Subject.id, Subject.code, Subject.name, Subject.credits, Subject.is_lab).order_by(Subject.code)
+        ).all() == stored
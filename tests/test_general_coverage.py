@@ -2,131 +2,148 @@ import pytest
 from app.models import User, UserRole, Enrollment, Subject, AssignedClass, EnrollmentStatus, TimetableSettings, TimetableEntry, Attendance, Branch
 from flask import url_for
 from datetime import datetime, date, time, timezone
-
+from types import SimpleNamespace
+from sqlalchemy import select
+
+@pytest.fixture(scope='module')
+def seed_ids(seed_session):
+    """Users, subject, class assignment and timetable settings shared by the module."""
+    # Create users
+    teacher = User(name="Teacher Two", email="teacher2@test.com", role=UserRole.TEACHER)
+    teacher.set_password("password")
+
+    student = User(name="Student Two", email="student2@test.com", role=UserRole.STUDENT, enrollment_number="S100", semester=2, branch=Branch.CSE)
+    student.set_password("password")
+
+    admin = User(name="Admin Two", email="admin2@test.com", role=UserRole.ADMIN)
+    admin.set_password("password")
+
+    # Create subject
+    subject = Subject(name="Adv Math", code="M-202", semester=2, branch="CSE")
+
+    # Assign Class (linked through relationships so a single flush inserts everything)
+    assigned_class = AssignedClass(
+        teacher=teacher,
+        subject=subject,
+        section="A"
+    )
+
+    # Timetable Settings
+    settings = TimetableSettings(
+        start_time=time(9,0),
+        end_time=time(17,0),
+        lunch_duration=60,
+        periods=7,
+        working_days="Monday,Tuesday,Wednesday,Thursday,Friday"
+    )
+    seed_session.add_all([teacher, student, admin, subject, assigned_class, settings])
+    seed_session.commit()
+
+    return SimpleNamespace(
+        teacher_id=teacher.id, student_id=student.id, admin_id=admin.id,
+        subject_id=subject.id, class_id=assigned_class.id, settings_id=settings.id
+    )
+
+@pytest.mark.xdist_group(name="general_coverage")
 class TestGeneralCoverage:
 
-    @pytest.fixture(autouse=True)
-    def setup_data(self, db):
-        # Create users
-        self.teacher = User(name="Teacher Two", email="teacher2@test.com", role=UserRole.TEACHER)
-        self.teacher.set_password("password")
-
-        self.student = User(name="Student Two", email="student2@test.com", role=UserRole.STUDENT, enrollment_number="S100", semester=2, branch=Branch.CSE)
-        self.student.set_password("password")
-
-        self.admin = User(name="Admin Two", email="admin2@test.com", role=UserRole.ADMIN)
-        self.admin.set_password("password")
-
-        # Create subject
-        self.subject = Subject(name="Adv Math", code="M-202", semester=2, branch="CSE")
-        db.session.add_all([self.teacher, self.student, self.admin, self.subject])
-        db.session.commit()
-
-        # Assign Class
-        self.assigned_class = AssignedClass(
-            teacher_id=self.teacher.id,
-            subject_id=self.subject.id,
-            section="A"
-        )
-        db.session.add(self.assigned_class)
-        db.session.commit()
-
-        # Timetable Settings
-        self.settings = TimetableSettings(
-            start_time=time(9,0),
-            end_time=time(17,0),
-            lunch_duration=60,
-            periods=7,
-            working_days="Monday,Tuesday,Wednesday,Thursday,Friday"
-        )
-        db.session.add(self.settings)
-        db.session.commit()
-
     # --- Student Views (Coverage/Smoke Tests) ---
-    def test_student_dashboard_access(self, client):
-        client.post('/auth/login', data={'email': 'student2@test.com', 'password': 'password'})
-        response = client.get('/student/dashboard')
-        assert response.status_code == 200
-        assert b"Dashboard" in response.data
-
     def test_unauthorized_dashboard_access(self, client):
         response = client.get('/student/dashboard', follow_redirects=True)
         assert response.status_code == 200
         assert b"Login" in response.data or b"Please log in" in response.data
 
-    def test_attendance_view_generic(self, client, db):
-        client.post('/auth/login', data={'email': 'student2@test.com', 'password': 'password'})
-        db.session.add(Attendance(user_id=self.student.id, subject_id=self.subject.id, date=date.today(), status='present'))
-        db.session.commit()
-        
-        response = client.get('/attendance')
+    def test_attendance_view_generic(self, client, auth, db, seed_ids, capture_sql):
+        auth.login_as(seed_ids.student_id)
+        db.session.add(Attendance(user_id=seed_ids.student_id, subject_id=seed_ids.subject_id, date=date.today(), status='present'))
+        db.session.flush()
+
+        with capture_sql() as statements:
+            response = client.get('/attendance')
         assert response.status_code == 200
         assert b"Adv Math" in response.data
+        # Subjects and per-subject counts are loaded once and reused for the overall stats
+        assert sum(s.lstrip().startswith('SELECT subjects.') for s in statements) == 1
+        assert sum('GROUP BY attendance.subject_id' in s for s in statements) == 1
 
     # --- Teacher Views (Coverage) ---
-    def test_teacher_dashboard_stats(self, client, db):
-        client.post('/auth/login', data={'email': 'teacher2@test.com', 'password': 'password'})
+    def test_teacher_dashboard_stats(self, client, auth, db, seed_ids):
+        auth.login_as(seed_ids.teacher_id)
         # Case 1: No enrollments
         resp = client.get('/teacher/dashboard')
         assert resp.status_code == 200
         assert b"1" in resp.data # 1 Active Class
 
         # Case 2: Enrollment exists
-        enrollment = Enrollment(student_id=self.student.id, class_id=self.assigned_class.id, status=EnrollmentStatus.PENDING)
+        enrollment = Enrollment(student_id=seed_ids.student_id, class_id=seed_ids.class_id, status=EnrollmentStatus.PENDING)
         db.session.add(enrollment)
-        db.session.commit()
+        db.session.flush()
         
         resp = client.get('/teacher/dashboard')
         assert resp.status_code == 200
 
-    def test_teacher_schedule_rendering(self, client, db):
-        client.post('/auth/login', data={'email': 'teacher2@test.com', 'password': 'password'})
+    def test_teacher_schedule_rendering(self, client, auth, db, seed_ids, capture_sql):
+        auth.login_as(seed_ids.teacher_id)
         entry = TimetableEntry(
-            day="Monday", period_number=1, assigned_class_id=self.assigned_class.id,
+            day="Monday", period_number=1, assigned_class_id=seed_ids.class_id,
             start_time=time(9,0), end_time=time(10,0), semester=2, branch="CSE"
         )
-        db.session.add(entry)
-        db.session.commit()
-
-        # Subject is Sem 2 (Even)
-        resp = client.get('/teacher/schedule?group=even')
+        other_class = AssignedClass(
+            teacher_id=seed_ids.teacher_id,
+            subject=Subject(name="Adv Physics", code="P-204", semester=4, branch="CSE")
+        )
+        db.session.add_all([entry, other_class])
+        db.session.flush()
+        db.session.add(TimetableEntry(
+            day="Monday", period_number=2, assigned_class_id=other_class.id,
+            start_time=time(10,0), end_time=time(11,0), semester=4, branch="CSE"
+        ))
+        db.session.flush()
+        db.session.expire_all()
+
+        with capture_sql() as statements:
+            # Subject is Sem 2 (Even)
+            resp = client.get('/teacher/schedule?group=even')
         assert resp.status_code == 200
         assert b"M-202" in resp.data
+        assert b"P-204" in resp.data
+        # Subjects come with the classes rather than one lazy load per grid cell
+        assert not any(s.lstrip().startswith('SELECT subjects.') for s in statements)
 
-    def test_teacher_actions_edit_download(self, client, db):
-        client.post('/auth/login', data={'email': 'teacher2@test.com', 'password': 'password'})
+    def test_teacher_actions_edit_download(self, client, auth, db, seed_ids):
+        auth.login_as(seed_ids.teacher_id)
         # Edit
-        resp = client.post(f'/teacher/class/{self.assigned_class.id}/edit', data={'section': 'B'}, follow_redirects=True)
-        assert resp.status_code == 200
-        db.session.refresh(self.assigned_class)
-        assert self.assigned_class.section == 'B'
+        resp = client.post(f'/teacher/class/{seed_ids.class_id}/edit', data={'section': 'B'})
+        assert resp.status_code == 302
+        section = db.session.execute(select(AssignedClass.section).where(AssignedClass.id == seed_ids.class_id)).scalar_one()
+        assert section == 'B'
         
         # Download (CSV)
-        enr = Enrollment(student_id=self.student.id, class_id=self.assigned_class.id, status=EnrollmentStatus.APPROVED)
+        enr = Enrollment(student_id=seed_ids.student_id, class_id=seed_ids.class_id, status=EnrollmentStatus.APPROVED)
         db.session.add(enr)
-        db.session.commit()
+        db.session.flush()
         
-        resp = client.get(f'/teacher/class/{self.assigned_class.id}/download')
+        resp = client.get(f'/teacher/class/{seed_ids.class_id}/download')
         assert resp.status_code == 200
         assert resp.headers['Content-Type'] == 'text/csv'
 
     # --- Admin Views (Coverage) ---
-    def test_admin_timetable_view_get(self, client, db):
-        client.post('/auth/login', data={'email': 'admin2@test.com', 'password': 'password'})
+    def test_admin_timetable_view_get(self, client, auth, db, seed_ids):
+        auth.login_as(seed_ids.admin_id)
         resp = client.get('/admin/timetable')
         assert resp.status_code == 200
         assert b"Settings" in resp.data
 
-    def test_admin_timetable_reset(self, client, db):
-        client.post('/auth/login', data={'email': 'admin2@test.com', 'password': 'password'})
+    def test_admin_timetable_reset(self, client, auth, db, seed_ids):
+        auth.login_as(seed_ids.admin_id)
         entry = TimetableEntry(
-            day="Monday", period_number=1, assigned_class_id=self.assigned_class.id,
+            day="Monday", period_number=1, assigned_class_id=seed_ids.class_id,
             start_time=time(9,0), end_time=time(10,0), semester=2, branch="CSE"
         )
         db.session.add(entry)
-        db.session.commit()
+        db.session.flush()
         
-        resp = client.post('/admin/timetable', data={'action': 'reset'}, follow_redirects=True)
-        assert resp.status_code == 200
+        resp = client.post('/admin/timetable', data={'action': 'reset'})
+        assert resp.status_code == 302
         assert TimetableEntry.query.count() == 0
 
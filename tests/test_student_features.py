@@ -1,55 +1,70 @@
 import pytest
 from app.models import User, UserRole, Enrollment, Subject, AssignedClass
-from flask import url_for
-from datetime import datetime, date
-from app.views import load_calendar_events
-
+from app.views import generate_acronym
+from datetime import date
+from types import SimpleNamespace
+from sqlalchemy import bindparam, select
+
+# Built once so the compiled statement is reused from SQLAlchemy's cache
+ENROLLMENT_STMT = select(Enrollment).where(
+    Enrollment.student_id == bindparam('student_id'),
+    Enrollment.class_id == bindparam('class_id')
+)
+
+@pytest.fixture(scope='module')
+def seed_ids(seed_session):
+    """Student, teacher and an assigned subject shared by the module."""
+    student = User(name="Student", email="student@test.com", role=UserRole.STUDENT, semester=1)
+    student.set_password("password")
+
+    subject = Subject(name="Math", code="CSE-101", semester=1, branch="CSE")
+    teacher = User(name="Teacher", email="teacher@test.com", role=UserRole.TEACHER)
+    teacher.set_password("password")
+
+    assignment = AssignedClass(teacher=teacher, subject=subject)
+
+    seed_session.add_all([student, teacher, subject, assignment])
+    seed_session.commit()
+
+    return SimpleNamespace(
+        student_id=student.id, teacher_id=teacher.id,
+        subject_id=subject.id, assignment_id=assignment.id
+    )
+
+@pytest.mark.xdist_group(name="student_features")
 class TestStudentFeatures:
 
     @pytest.fixture(autouse=True)
-    def setup(self, db):
-        self.student = User(name="Student", email="student@test.com", role=UserRole.STUDENT, semester=1)
-        self.student.set_password("password")
-
-        self.subject = Subject(name="Math", code="CSE-101", semester=1, branch="CSE")
-        self.teacher = User(name="Teacher", email="teacher@test.com", role=UserRole.TEACHER)
-        self.teacher.set_password("password")
-
-        db.session.add_all([self.student, self.teacher, self.subject])
-        db.session.commit()
-
-        self.assignment = AssignedClass(teacher_id=self.teacher.id, subject_id=self.subject.id)
-        db.session.add(self.assignment)
-        db.session.commit()
-
-    def login_student(self, client):
-        return client.post('/auth/login', data={'email': 'student@test.com', 'password': 'password'}, follow_redirects=True)
-    
-    def test_curriculum_view(self, client):
-        self.login_student(client)
-        response = client.get('/curriculum')
-        assert response.status_code == 200
-        assert b"Math" in response.data or b"CSE-101" in response.data 
-
-    def test_calendar_view(self, client):
-        self.login_student(client)
-        response = client.get('/calendar')
+    def setup(self, db, seed_ids):
+        self.ids = seed_ids
+
+    @pytest.mark.parametrize("path,needles", [
+        ('/curriculum', [b"Math"]),
+        ('/calendar', [b"Calendar"]),
+        ('/student/dashboard', [b"Dashboard", b"Attendance"]),
+    ])
+    def test_student_page_renders(self, client, auth, path, needles):
+        auth.login_as(self.ids.student_id)
+        response = client.get(path)
         assert response.status_code == 200
-        assert b"Calendar" in response.data
+        for needle in needles:
+            assert needle in response.data
 
-    def test_student_join_class(self, client, db):
-        self.login_student(client)
+    def test_student_join_class(self, client, auth, db):
+        auth.login_as(self.ids.student_id)
 
-        response = client.post(f'/student/join_class/{self.assignment.id}', follow_redirects=True)
+        response = client.post(f'/student/join_class/{self.ids.assignment_id}', follow_redirects=True)
         assert response.status_code == 200
         assert b"Enrollment request sent" in response.data
 
         # Verify
-        enrollment = Enrollment.query.filter_by(student_id=self.student.id, class_id=self.assignment.id).first()
+        enrollment = db.session.execute(
+            ENROLLMENT_STMT, {'student_id': self.ids.student_id, 'class_id': self.ids.assignment_id}
+        ).scalar_one_or_none()
         assert enrollment is not None
 
-    def test_update_profile(self, client, db):
-        self.login_student(client)
+    def test_update_profile(self, client, auth, db):
+        auth.login_as(self.ids.student_id)
 
         data = {
             'phone': '1112223333',
@@ -62,13 +77,13 @@ class TestStudentFeatures:
         assert response.status_code == 200
         assert b"Profile updated successfully" in response.data        
 
-        updated = db.session.get(User, self.student.id)
+        updated = db.session.get(User, self.ids.student_id, populate_existing=True)
         assert updated.phone == '1112223333'
         assert updated.semester == 2
         assert updated.date_of_birth == date(2000, 1, 1)
 
-    def test_change_password(self, client, db):
-        self.login_student(client)
+    def test_change_password(self, client, auth, db):
+        auth.login_as(self.ids.student_id)
 
         data = {
             'current_password': 'password',
@@ -76,17 +91,18 @@ class TestStudentFeatures:
             'confirm_password': 'newpassword'
         }
 
-        response = client.post('/settings', data=data, follow_redirects=True)
-        assert response.status_code == 200
-        assert b"Password updated successfully" in response.data       
+        response = client.post('/settings', data=data)
+        assert response.status_code == 302
+        with client.session_transaction() as session:
+            assert any("Password updated successfully" in message for _, message in session['_flashes'])
 
-        # Verify login with new password
-        client.get('/auth/logout')
-        response = client.post('/auth/login', data={'email': 'student@test.com', 'password': 'newpassword'}, follow_redirects=True)
-        assert b"Welcome back" in response.data
+        # Verify the new password at the model layer instead of logging in again
+        updated = db.session.get(User, self.ids.student_id, populate_existing=True)
+        assert updated.check_password('newpassword')
+        assert not updated.check_password('password')
 
-    def test_change_password_fail_mismatch(self, client):
-        self.login_student(client)
+    def test_change_password_fail_mismatch(self, client, auth):
+        auth.login_as(self.ids.student_id)
         data = {
             'current_password': 'password',
             'new_password': 'newpassword',
@@ -95,8 +111,8 @@ class TestStudentFeatures:
         response = client.post('/settings', data=data, follow_redirects=True)
         assert b"New passwords do not match" in response.data
 
-    def test_change_password_fail_wrong_current(self, client):
-        self.login_student(client)
+    def test_change_password_fail_wrong_current(self, client, auth):
+        auth.login_as(self.ids.student_id)
         data = {
             'current_password': 'wrongpassword',
             'new_password': 'newpassword',
@@ -105,25 +121,37 @@ class TestStudentFeatures:
         response = client.post('/settings', data=data, follow_redirects=True)
         assert b"Incorrect current password" in response.data
 
-    def test_calendar_events_loading(self, app):
+    def test_calendar_events_loading(self):
         """Test calendar events loading function logic"""
-        # Testing the utility function directly
-        with app.app_context():
-            events = load_calendar_events()
-            assert isinstance(events, dict)
-            # Check for known holidays or basic structure is maintained
-            # The original script checked for 2025 events
-            # We assume the json file is present
-            
-            if '2025-01-26' in events:
-                assert "Republic Day" in events['2025-01-26']
+        from app.views import load_calendar_events
+        # Testing the utility function directly; it only reads the JSON file,
+        # so no app context is needed
+        events = load_calendar_events()
+        assert isinstance(events, dict)
+        # Check for known holidays or basic structure is maintained
+        # The original script checked for 2025 events
+        # We assume the json file is present
+        
+        if '2025-01-26' in events:
+            assert "Republic Day" in events['2025-01-26']
+
+    @pytest.mark.parametrize("name,acronym", [
+        ("Data Structures and Algorithms", "DSA"),
+        ("Programming in C", "PIC"),
+        ("Physics & Chemistry", "PC"),
+        ("Mathematics", "Mathematics"),
+        ("And Or", "AO"),
+    ])
+    def test_generate_acronym(self, name, acronym):
+        """Chart labels abbreviate subject names, skipping joining words"""
+        assert generate_acronym(name) == acronym
 
     def test_new_user_attendance_stats_are_zero(self, db):
         """Verify new users start with 0 attendance"""
         user = User(name="Newbie", email="newbie@test.com", role=UserRole.STUDENT, semester=1)
         user.set_password("password")
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()
         
         stats = user.get_overall_attendance_stats()
         assert stats['total_classes'] == 0
@@ -132,8 +160,8 @@ class TestStudentFeatures:
 
     # --- New Tests Added ---
 
-    def test_account_delete_failure_incorrect_confirmation(self, client):
-        self.login_student(client)
+    def test_account_delete_failure_incorrect_confirmation(self, client, auth):
+        auth.login_as(self.ids.student_id)
         
         # Try to delete without correct "DELETE" string
         response = client.post('/delete_account', data={'confirmation': 'delete'}, follow_redirects=True)
@@ -142,35 +170,26 @@ class TestStudentFeatures:
         resp2 = client.get('/student/dashboard') 
         assert resp2.status_code == 200
 
-    def test_account_delete_success(self, client, db):
-        self.login_student(client)
+    def test_account_delete_success(self, client, auth, db):
+        auth.login_as(self.ids.student_id)
         
-        response = client.post('/delete_account', data={'confirmation': 'DELETE'}, follow_redirects=True)
-        assert b"account has been successfully deleted" in response.data or b"Login" in response.data
+        response = client.post('/delete_account', data={'confirmation': 'DELETE'})
+        assert response.status_code == 302
         
         # Verify DB
-        assert db.session.get(User, self.student.id) is None
+        assert db.session.get(User, self.ids.student_id) is None
 
-    def test_join_class_nonexistent(self, client):
-        self.login_student(client)
-        response = client.post('/student/join_class/9999', follow_redirects=True)
-        # Should show error or 404
-        assert response.status_code in [404, 500, 200]
-        # Usually flask returns 404 page with 404 status
+    def test_join_class_nonexistent(self, client, auth):
+        auth.login_as(self.ids.student_id)
+        response = client.post('/student/join_class/9999')
+        assert response.status_code == 404
 
-    def test_join_class_already_joined(self, client, db):
-        self.login_student(client)
+    def test_join_class_already_joined(self, client, auth, db):
+        auth.login_as(self.ids.student_id)
         
         # Join once
-        client.post(f'/student/join_class/{self.assignment.id}', follow_redirects=True)
+        client.post(f'/student/join_class/{self.ids.assignment_id}')
         
         # Try joining again
-        response = client.post(f'/student/join_class/{self.assignment.id}', follow_redirects=True)
+        response = client.post(f'/student/join_class/{self.ids.assignment_id}', follow_redirects=True)
         assert b"already requested" in response.data or b"Already enrolled" in response.data
-
-    def test_student_dashboard_load(self, client):
-        self.login_student(client)
-        response = client.get('/student/dashboard')
-        assert response.status_code == 200
-        # Check for attendance chart canvas or similar
-        assert b"Attendance" in response.data
@@ -1,29 +1,32 @@
 import pytest
 from datetime import datetime, time, date, timedelta
-from unittest.mock import patch
 from app.models import User, UserRole, Branch, Subject, TimetableSettings, AssignedClass, TimetableEntry, Enrollment, EnrollmentStatus, Attendance
 from flask import url_for as base_url_for
+from sqlalchemy import bindparam, select
 
 # Helper to avoid import issues if url_for needs app context, but fixtures usually provide valid context
 # We'll just use client requests directly mostly.
 
+# Built once so the compiled statement is reused from SQLAlchemy's cache
+ATTENDANCE_STMT = select(Attendance).where(
+    Attendance.user_id == bindparam('user_id'),
+    Attendance.subject_id == bindparam('subject_id'),
+    Attendance.date == bindparam('date')
+).execution_options(populate_existing=True)
+
 # --- Fixtures ---
+@pytest.mark.xdist_group(name="teacher_features")
 class TestTeacherFeatures:
     
     @pytest.fixture
-    def basic_teacher_setup(self, db):
-        teacher = User(name="Teacher", email="teacher@test.com", role=UserRole.TEACHER, institution="DTC")
-        teacher.set_password("password")
+    def basic_teacher_setup(self, db, user_factory):
+        teacher = user_factory("Teacher", "teacher@test.com", UserRole.TEACHER, institution="DTC")
         
-        student = User(name="Student", email="student@test.com", role=UserRole.STUDENT, semester=1, institution="DTC")
-        student.set_password("password")
+        student = user_factory("Student", "student@test.com", UserRole.STUDENT, semester=1, institution="DTC")
         
         subject = Subject(name="Math", code="MATH101", semester=1, branch="CSE")
-        db.session.add_all([teacher, student, subject])
-        db.session.commit()
-        
-        assign = AssignedClass(teacher_id=teacher.id, subject_id=subject.id, section="A")
-        db.session.add(assign)
+        assign = AssignedClass(teacher=teacher, subject=subject, section="A")
+        db.session.add_all([teacher, student, subject, assign])
         db.session.commit()
         
         return {
@@ -34,19 +37,17 @@ class TestTeacherFeatures:
         }
 
     # --- Dashboard Timetable Tests (Live Class) ---
-    def test_dashboard_shows_active_class(self, client, auth, db):
+    def test_dashboard_shows_active_class(self, client, auth, db, user_factory, freeze_view_time):
         # Setup specific data for this test
-        dashboard_teacher = User(name="Dash T", email="dash@t.com", role=UserRole.TEACHER)
-        dashboard_teacher.set_password("password")
-        db.session.add(dashboard_teacher)
+        dashboard_teacher = user_factory("Dash T", "dash@t.com", UserRole.TEACHER)
         
         subject = Subject(name="Live Subject", code="LIVE101", semester=3, branch="CSE")
         db.session.add(subject)
-        db.session.commit()
+        db.session.flush()
         
         ac = AssignedClass(teacher_id=dashboard_teacher.id, subject_id=subject.id, section="A")
         db.session.add(ac)
-        db.session.commit()
+        db.session.flush()
         
         # Monday 10:00 - 11:00
         entry = TimetableEntry(
@@ -54,45 +55,35 @@ class TestTeacherFeatures:
             start_time=time(10, 0), end_time=time(11, 0), assigned_class_id=ac.id
         )
         db.session.add(entry)
-        db.session.commit()
+        db.session.flush()
         
-        auth.login(email=dashboard_teacher.email, password="password")
+        auth.login_as(dashboard_teacher.id)
         
         # Mock time: Monday 10:30 AM
-        mock_now = datetime(2024, 1, 1, 10, 30, 0) # Jan 1 2024 is Monday
-        
-        with patch('app.views.datetime') as mock_datetime:
-            mock_datetime.now.return_value = mock_now
-            mock_datetime.strptime.side_effect = lambda *args, **kwargs: datetime.strptime(*args, **kwargs)
-            
-            response = client.get('/teacher/dashboard')
-            assert response.status_code == 200
-            assert b"Live Class" in response.data
-            assert b"Live Subject" in response.data
+        freeze_view_time(datetime(2024, 1, 1, 10, 30, 0)) # Jan 1 2024 is Monday
+
+        response = client.get('/teacher/dashboard')
+        assert response.status_code == 200
+        assert b"Live Class" in response.data
+        assert b"Live Subject" in response.data
 
-    def test_dashboard_hides_inactive(self, client, auth, db):
+    def test_dashboard_hides_inactive(self, client, auth, db, user_factory, freeze_view_time):
         # Similar setup... reuse helper if possible but keeping self-contained for clarity
-        dashboard_teacher = User(name="Dash T2", email="dash2@t.com", role=UserRole.TEACHER)
-        dashboard_teacher.set_password("password")
-        db.session.add(dashboard_teacher)
-        db.session.commit()
+        dashboard_teacher = user_factory("Dash T2", "dash2@t.com", UserRole.TEACHER)
+        db.session.flush()
         
-        auth.login(email="dash2@t.com", password="password")
+        auth.login_as(dashboard_teacher.id)
         
         # Monday 12:00 PM (No class)
-        mock_now = datetime(2024, 1, 1, 12, 0, 0)
-        
-        with patch('app.views.datetime') as mock_datetime:
-            mock_datetime.now.return_value = mock_now
-            mock_datetime.strptime.side_effect = lambda *args, **kwargs: datetime.strptime(*args, **kwargs)
-            
-            response = client.get('/teacher/dashboard')
-            assert b"Live Class" not in response.data
+        freeze_view_time(datetime(2024, 1, 1, 12, 0, 0))
+
+        response = client.get('/teacher/dashboard')
+        assert b"Live Class" not in response.data
 
     # --- Attendance Tests ---
     def test_mark_attendance_page_loads(self, client, auth, basic_teacher_setup):
         setup = basic_teacher_setup
-        auth.login(email=setup["teacher"].email, password="password")
+        auth.login_as(setup["teacher"].id)
         
         response = client.get(f'/teacher/class/{setup["assignment"].id}/attendance')
         assert response.status_code == 200
@@ -100,14 +91,15 @@ class TestTeacherFeatures:
 
     def test_submit_attendance(self, client, auth, basic_teacher_setup, db):
         setup = basic_teacher_setup
-        auth.login(email=setup["teacher"].email, password="password")
+        auth.login_as(setup["teacher"].id)
         
         # Enroll student first
         enroll = Enrollment(student_id=setup["student"].id, class_id=setup["assignment"].id, status=EnrollmentStatus.APPROVED)
         db.session.add(enroll)
-        db.session.commit()
+        db.session.flush()
         
-        today_str = date.today().strftime('%Y-%m-%d')
+        today = date.today()
+        today_str = today.isoformat()
         data = {
             'date': today_str,
             f'attendance_{setup["student"].id}': 'on'
@@ -118,42 +110,45 @@ class TestTeacherFeatures:
         assert b"Attendance marked" in response.data
         
         # Verify DB
-        rec = Attendance.query.filter_by(user_id=setup["student"].id, date=date.today()).first()
+        rec = db.session.execute(ATTENDANCE_STMT, {
+            'user_id': setup["student"].id, 'subject_id': setup["subject"].id, 'date': today
+        }).scalar_one_or_none()
         assert rec is not None
         assert rec.status == 'present'
 
     # --- Lab Attendance (Consolidated from test_lab_attendance.py) ---
-    def test_lab_attendance_marking(self, client, auth, db):
+    def test_lab_attendance_marking(self, client, auth, db, user_factory):
         # Setup Lab Teacher/Subject
-        teacher = User(name="Lab T", email="lab@t.com", role=UserRole.TEACHER)
-        teacher.set_password("password")
-        student = User(name="Lab S", email="labs@t.com", role=UserRole.STUDENT, semester=5, branch="CSE")
-        student.set_password("password")
+        teacher = user_factory("Lab T", "lab@t.com", UserRole.TEACHER)
+        student = user_factory("Lab S", "labs@t.com", UserRole.STUDENT, semester=5, branch="CSE")
         lab = Subject(name="Phys Lab", code="PHYLAB", semester=5, branch="CSE", credits=1, is_lab=True)
         
         db.session.add_all([teacher, student, lab])
-        db.session.commit()
+        db.session.flush()
         
         assign = AssignedClass(teacher_id=teacher.id, subject_id=lab.id, section="A")
         db.session.add(assign)
-        db.session.commit()
+        db.session.flush()
         
         enroll = Enrollment(student_id=student.id, class_id=assign.id, status=EnrollmentStatus.APPROVED)
         db.session.add(enroll)
-        db.session.commit()
+        db.session.flush()
         
-        auth.login("lab@t.com", "password")
+        auth.login_as(teacher.id)
         
-        today_str = date.today().strftime('%Y-%m-%d')
+        today = date.today()
+        today_str = today.isoformat()
         response = client.post(f'/teacher/class/{assign.id}/attendance', data={
             'date': today_str,
             f'attendance_{student.id}': 'on'
-        }, follow_redirects=True)
+        })
         
-        assert response.status_code == 200
+        assert response.status_code == 302
         
         # Verify is_lab/class_type logic
-        rec = Attendance.query.filter_by(user_id=student.id, subject_id=lab.id).first()
+        rec = db.session.execute(ATTENDANCE_STMT, {
+            'user_id': student.id, 'subject_id': lab.id, 'date': today
+        }).scalar_one()
         assert rec.class_type == 'lab'
 
     # --- Enrollment Management ---
@@ -163,47 +158,43 @@ class TestTeacherFeatures:
         # Create pending enrollment
         enroll = Enrollment(student_id=setup["student"].id, class_id=setup["assignment"].id, status=EnrollmentStatus.PENDING)
         db.session.add(enroll)
-        db.session.commit()
+        db.session.flush()
         
-        auth.login(email=setup["teacher"].email, password="password")
+        auth.login_as(setup["teacher"].id)
         
         # Approve
-        resp = client.post(f'/teacher/enrollment/{enroll.id}', data={'action': 'approve'}, follow_redirects=True)
-        assert resp.status_code == 200
+        resp = client.post(f'/teacher/enrollment/{enroll.id}', data={'action': 'approve'})
+        assert resp.status_code == 302
         
-        updated = db.session.get(Enrollment, enroll.id)
+        updated = db.session.get(Enrollment, enroll.id, populate_existing=True)
         assert updated.status == EnrollmentStatus.APPROVED
 
-    def test_curriculum_assignment_visibility(self, client, auth, db):
+    def test_curriculum_assignment_visibility(self, client, auth, db, user_factory):
         """Test that assignment makes teacher appear in student curriculum"""
-        teacher = User(name='Professor X', email='prof@x.com', role=UserRole.TEACHER, branch=Branch.CSE)
-        teacher.set_password('password')
-        student = User(name='Logan', email='wolv@x.com', role=UserRole.STUDENT, branch=Branch.CSE, semester=1)
-        student.set_password('password')
+        teacher = user_factory('Professor X', 'prof@x.com', UserRole.TEACHER, branch=Branch.CSE)
+        student = user_factory('Logan', 'wolv@x.com', UserRole.STUDENT, branch=Branch.CSE, semester=1)
         subject = Subject(name='X-Men History', code='HIS101', branch='CSE', semester=1)
         
         db.session.add_all([teacher, student, subject])
-        db.session.commit()
+        db.session.flush()
         
         assign = AssignedClass(teacher_id=teacher.id, subject_id=subject.id)
         db.session.add(assign)
-        db.session.commit()
+        db.session.flush()
         
-        auth.login('wolv@x.com', 'password')
+        auth.login_as(student.id)
         response = client.get('/curriculum')
         assert b'Professor X' in response.data or b'prof@x.com' in response.data or b'X-Men History' in response.data
 
-    def test_access_other_teacher_class_denied(self, client, auth, db, basic_teacher_setup):
+    def test_access_other_teacher_class_denied(self, client, auth, db, basic_teacher_setup, user_factory):
         """Ensure a teacher cannot access another teacher's class details"""
         setup = basic_teacher_setup
         
         # Create another teacher
-        other_teacher = User(name="Other T", email="other@t.com", role=UserRole.TEACHER)
-        other_teacher.set_password("password")
-        db.session.add(other_teacher)
-        db.session.commit()
+        other_teacher = user_factory("Other T", "other@t.com", UserRole.TEACHER)
+        db.session.flush()
         
-        auth.login("other@t.com", "password")
+        auth.login_as(other_teacher.id)
         
         # Try to access first teacher's class
         response = client.get(f'/teacher/class/{setup["assignment"].id}', follow_redirects=True)
@@ -214,7 +205,7 @@ class TestTeacherFeatures:
     # --- New Tests Added ---
     def test_view_enrollments_list(self, client, auth, basic_teacher_setup):
         setup = basic_teacher_setup
-        auth.login(setup["teacher"].email, "password")
+        auth.login_as(setup["teacher"].id)
         
         response = client.get(f'/teacher/enrollments')
         assert response.status_code == 200
@@ -222,7 +213,7 @@ class TestTeacherFeatures:
 
     def test_teacher_dashboard_context(self, client, auth, basic_teacher_setup):
         setup = basic_teacher_setup
-        auth.login(setup["teacher"].email, "password")
+        auth.login_as(setup["teacher"].id)
         
         response = client.get('/teacher/dashboard')
         assert response.status_code == 200
@@ -231,14 +222,14 @@ class TestTeacherFeatures:
         assert setup["subject"].name.encode() in response.data or b"Dashboard" in response.data
 
     def test_settings_page_load(self, client, auth, basic_teacher_setup):
-        auth.login(basic_teacher_setup["teacher"].email, "password")
+        auth.login_as(basic_teacher_setup["teacher"].id)
         response = client.get('/settings')
         assert response.status_code == 200
         assert b"Settings" in response.data
 
     def test_teacher_view_student_profile(self, client, auth, basic_teacher_setup):
         setup = basic_teacher_setup
-        auth.login(setup["teacher"].email, "password")
+        auth.login_as(setup["teacher"].id)
         # Assuming there is a route /student/<id> or similar, or just check attendance page has student name
         # We can check attendance page again for student name as a proxy
         response = client.get(f'/teacher/class/{setup["assignment"].id}/attendance')
@@ -251,7 +242,7 @@ class TestTeacherFeatures:
         # Create Subject with ODD (1)
         # already in setup ["subject"] is sem 1
         
-        auth.login(basic_teacher_setup["teacher"].email, "password")
+        auth.login_as(basic_teacher_setup["teacher"].id)
         response = client.get('/teacher/classes')
         # Should NOT show the sem 1 subject if active is EVEN
         # Note: basic_teacher_setup creates subject with sem=1 (ODD)
@@ -263,7 +254,7 @@ class TestTeacherFeatures:
 
     def test_edit_class_details(self, client, auth, basic_teacher_setup, db):
         setup = basic_teacher_setup
-        auth.login(setup["teacher"].email, "password")
+        auth.login_as(setup["teacher"].id)
         
         # Change section from 'A' to 'C'
         response = client.post(f'/teacher/class/{setup["assignment"].id}/edit', data={
@@ -274,19 +265,17 @@ class TestTeacherFeatures:
         assert b"updated successfully" in response.data
         
         # Verify in DB
-        refreshed = db.session.get(AssignedClass, setup["assignment"].id)
+        refreshed = db.session.get(AssignedClass, setup["assignment"].id, populate_existing=True)
         assert refreshed.section == 'C'
 
-    def test_edit_class_unauthorized(self, client, auth, basic_teacher_setup, db):
+    def test_edit_class_unauthorized(self, client, auth, basic_teacher_setup, db, user_factory):
         setup = basic_teacher_setup
         
         # Another teacher
-        t2 = User(name="T2", email="t2@test.com", role=UserRole.TEACHER)
-        t2.set_password("pass")
-        db.session.add(t2)
-        db.session.commit()
+        t2 = user_factory("T2", "t2@test.com", UserRole.TEACHER, password="pass")
+        db.session.flush()
         
-        auth.login("t2@test.com", "pass")
+        auth.login_as(t2.id)
         
         # Try to edit T1's class
         response = client.post(f'/teacher/class/{setup["assignment"].id}/edit', data={
@@ -296,12 +285,12 @@ class TestTeacherFeatures:
         # Should redirect or error
         assert b"Unauthorized" in response.data or b"Dashboard" in response.data
         
-        refreshed = db.session.get(AssignedClass, setup["assignment"].id)
+        refreshed = db.session.get(AssignedClass, setup["assignment"].id, populate_existing=True)
         assert refreshed.section == 'A' # Unchanged
 
     def test_download_report_access(self, client, auth, basic_teacher_setup):
         setup = basic_teacher_setup
-        auth.login(setup["teacher"].email, "password")
+        auth.login_as(setup["teacher"].id)
         
         response = client.get(f'/teacher/class/{setup["assignment"].id}/download')
         # Could be csv or excel, check content type or success
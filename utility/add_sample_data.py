@@ -14,17 +14,45 @@ Usage:
 import os
 import sys
 import argparse
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 import random
 
 # Add the app directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
 from app import create_app
 from app.models import db, User, Subject, Attendance, Marks
 
-def add_sample_attendance(user_id, days_back=30):
-    """Add sample attendance data for a user"""
+# Built once and reused for every user; rows are passed as executemany parameters.
+# Rows that already exist (unique user/subject/date index) are skipped by SQLite itself.
+_ATTENDANCE_INSERT = sqlite_insert(Attendance.__table__).on_conflict_do_nothing()
+_ATTENDANCE_UNIQUE_INDEX = next(
+    index for index in Attendance.__table__.indexes
+    if index.name == 'ix_attendance_user_subject_date'
+)
+
+def ensure_attendance_index():
+    """Add the unique attendance index to databases created before it existed.
+    
+    db.create_all() never adds indexes to existing tables. Returns False when
+    duplicate rows already in the table prevent creating it.
+    """
+    try:
+        _ATTENDANCE_UNIQUE_INDEX.create(db.engine, checkfirst=True)
+        return True
+    except IntegrityError:
+        print("⚠️  Duplicate attendance rows exist, so the unique index can't be added; checking existing rows per user instead")
+        return False
+
+def add_sample_attendance(user_id, days_back=30, check_existing=False):
+    """Add sample attendance data for a user
+    
+    Pass check_existing=True when the unique attendance index is missing, so
+    existing (subject, date) pairs are skipped here instead of by the insert.
+    """
     user = User.query.get(user_id)
     if not user:
         print(f"❌ User with ID {user_id} not found")
@@ -39,46 +67,52 @@ def add_sample_attendance(user_id, days_back=30):
     
     # Generate attendance for last N days
     start_date = date.today() - timedelta(days=days_back)
+    # One timestamp for the whole batch instead of a clock read per record
+    recorded_at = datetime.now(timezone.utc)
     
-    added_count = 0
+    # Weekdays in the window, already in chronological order (classes are Monday-Friday).
+    # Built once and shared by every subject.
+    class_days = [
+        start_date + timedelta(days=i)
+        for i in range(days_back)
+        if (start_date + timedelta(days=i)).weekday() < 5
+    ]
+    
+    # Fetch the user's existing (subject, date) pairs once instead of a lookup per row
+    existing_keys = set()
+    if check_existing:
+        existing_keys = set(
+            db.session.query(Attendance.subject_id, Attendance.date)
+            .filter(Attendance.user_id == user_id, Attendance.date >= start_date)
+            .all()
+        )
+    
+    rows = []
     for subject in subjects:
         # Generate random attendance pattern (70-95% attendance)
         attendance_rate = random.uniform(0.7, 0.95)
         
-        for i in range(days_back):
-            current_date = start_date + timedelta(days=i)
-            
-            # Skip weekends (assuming classes are Monday-Friday)
-            if current_date.weekday() >= 5:
+        # Draw all days at once: 60% chance of a class, status based on attendance rate
+        has_class = random.choices((True, False), weights=(0.6, 0.4), k=len(class_days))
+        statuses = random.choices(('present', 'absent'), weights=(attendance_rate, 1 - attendance_rate), k=len(class_days))
+        
+        for current_date, held, status in zip(class_days, has_class, statuses):
+            if not held or (subject.id, current_date) in existing_keys:
                 continue
             
-            # Random chance of having class on this day (60% chance)
-            if random.random() < 0.6:
-                # Determine attendance status based on attendance rate
-                if random.random() < attendance_rate:
-                    status = 'present'
-                else:
-                    status = 'absent'
-                
-                # Check if attendance already exists
-                existing = Attendance.query.filter_by(
-                    user_id=user_id,
-                    subject_id=subject.id,
-                    date=current_date
-                ).first()
-                
-                if not existing:
-                    attendance = Attendance(
-                        user_id=user_id,
-                        subject_id=subject.id,
-                        date=current_date,
-                        status=status,
-                        class_type='lecture'
-                    )
-                    db.session.add(attendance)
-                    added_count += 1
+            rows.append({
+                'user_id': user_id,
+                'subject_id': subject.id,
+                'date': current_date,
+                'status': status,
+                'class_type': 'lecture',
+                'recorded_at': recorded_at
+            })
     
     try:
+        added_count = 0
+        if rows:
+            added_count = db.session.execute(_ATTENDANCE_INSERT, rows).rowcount
         db.session.commit()
         print(f"✅ Added {added_count} attendance records for {user.name}")
         
@@ -214,6 +248,8 @@ def main():
             list_users()
             return
         
+        check_existing = not args.marks_only and not ensure_attendance_index()
+        
         if args.user_id:
             # Add data for specific user
             user = User.query.get(args.user_id)
@@ -224,7 +260,7 @@ def main():
             
             success = True
             if not args.marks_only:
-                success &= add_sample_attendance(args.user_id, args.days)
+                success &= add_sample_attendance(args.user_id, args.days, check_existing)
             
             if not args.attendance_only:
                 success &= add_sample_marks(args.user_id)
@@ -245,7 +281,7 @@ def main():
                 print(f"\n👤 Processing {user.name}...")
                 
                 if not args.marks_only:
-                    add_sample_attendance(user.id, args.days)
+                    add_sample_attendance(user.id, args.days, check_existing)
                 
                 if not args.attendance_only:
                     add_sample_marks(user.id)
@@ -91,8 +91,7 @@ def create_test_accounts():
         print(f"   ⚠️  Skipped: {skipped_count} existing accounts")
         
         # Display final summary
-        all_users = User.query.all()
-        print(f"\n📊 Total users in database: {len(all_users)}")
+        print(f"\n📊 Total users in database: {User.query.count()}")
         
         print("\n🔑 Test Account Credentials:")
         print("=" * 40)